@@ -20,16 +20,86 @@ try:
 except ImportError:
     anthropic = None
 
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+# orjson parses and serializes several times faster than stdlib json;
+# fall back when it's not installed (CI only installs anthropic).
+_loads = orjson.loads if orjson is not None else json.loads
+
+# Static analysis rubric. Sent as the system prompt with an ephemeral
+# cache_control marker so Anthropic's prompt caching reuses the prefix
+# across daily runs - only the fresh data summary is billed as new input.
+# One line of the daily breakdown; filled straight from a daily_breakdown
+# dict via format_map, which skips re-evaluating an f-string (and eight
+# subscript lookups) per day.
+DAILY_LINE = (
+    "  {date}: Sleep {sleep_score}/100 ({sleep_hours}h, {deep_sleep_hours}h deep), "
+    "Readiness {readiness_score}, Activity {activity_score}, "
+    "Steps {steps}, HRV {hrv}, RHR {resting_hr}"
+)
+
+SYSTEM_PROMPT = """Analyze the provided Oura Ring health data and give personalized insights for a patient managing three concurrent conditions:
+
+1. Post-COVID autonomic dysfunction (POTS with vasovagal syncope) — HRV is the primary biomarker for autonomic nervous system health. Low or declining HRV signals sympathetic overdrive. Resting HR trends matter because tachycardia at rest suggests poor autonomic regulation. Sleep quality directly affects next-day orthostatic tolerance.
+
+2. Early Hashimoto's thyroiditis (TPO 267) — Temperature deviations can signal thyroid flares or immune activation. Deep sleep is when the immune system does most of its repair work; insufficient deep sleep may worsen autoimmune activity. Elevated resting HR can also indicate thyroid hormone fluctuations.
+
+3. Vestibular symptoms from suspected neurovascular compression at bilateral IACs — Poor sleep and low HRV worsen vestibular compensation. Recovery metrics indicate whether the nervous system has capacity for vestibular rehab exercises.
+
+The patient follows a structured daily protocol: LMNT electrolytes, iron bisglycinate (every other day), magnesium threonate (AM) + glycinate (PM), DGL, zinc carnosine, selenium, omega-3, plus daily exercises (diaphragmatic breathing, calf raises, walking) and vestibular rehab (gaze stabilization, balance training).
+
+Analyze with clinical specificity. Reference actual numbers. Look for patterns across days — do low-HRV days follow poor sleep? Are there temp deviation spikes suggesting immune activation? Is activity appropriately graded for POTS (avoiding overexertion that crashes autonomic function)?
+
+Return ONLY valid JSON in this exact format:
+{
+  "overall_assessment": "A 2-3 sentence overall assessment referencing the three conditions and key metrics",
+  "whats_going_well": [
+    "Specific positive observation 1 with data reference",
+    "Specific positive observation 2 with data reference",
+    "Specific positive observation 3 with data reference"
+  ],
+  "areas_to_improve": [
+    "Specific area needing attention 1 with actionable advice",
+    "Specific area needing attention 2 with actionable advice",
+    "Specific area needing attention 3 with actionable advice"
+  ],
+  "autonomic_assessment": "2-3 sentences on what HRV trends, resting HR, and recovery metrics suggest about current autonomic nervous system status and POTS stability",
+  "thyroid_immune_signals": "1-2 sentences on temperature deviations, deep sleep adequacy, and any patterns suggesting Hashimoto's flare activity",
+  "vestibular_readiness": "1-2 sentences on whether recovery metrics indicate capacity for vestibular rehab, and any days where rehab should be scaled back",
+  "focus_for_next_week": "One specific, actionable recommendation tied to whichever condition the data suggests needs the most attention right now"
+}"""
+
+
+def write_json(path, payload):
+    """Write a JSON report with 2-space indent and a trailing newline.
+
+    The report is serialized to one bytes buffer and written with a single
+    os.write, skipping the TextIOWrapper layer and the second syscall for
+    the trailing newline.
+    """
+    if orjson is not None:
+        buf = orjson.dumps(payload, option=orjson.OPT_INDENT_2 | orjson.OPT_APPEND_NEWLINE)
+    else:
+        buf = (json.dumps(payload, indent=2) + "\n").encode("utf-8")
+    fd = os.open(path, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o644)
+    try:
+        os.write(fd, buf)
+    finally:
+        os.close(fd)
+
 
 def load_oura_data():
     """Load Oura data from JSON file."""
     try:
-        with open("oura-data.json", "r", encoding="utf-8") as f:
-            return json.load(f)
+        with open("oura-data.json", "rb") as f:
+            return _loads(f.read())
     except FileNotFoundError:
         print("oura-data.json not found. Run sync_oura.py first.", file=sys.stderr)
         return None
-    except json.JSONDecodeError as e:
+    except ValueError as e:
         print(f"Error parsing oura-data.json: {e}", file=sys.stderr)
         return None
 
@@ -108,38 +178,40 @@ def prepare_data_summary(data):
     }
 
 
-def analyze_with_claude(summary):
-    """Use Claude to analyze the Oura data and provide insights."""
-    api_key = os.getenv("ANTHROPIC_API_KEY")
-    if not api_key:
-        print("Missing ANTHROPIC_API_KEY", file=sys.stderr)
-        return None
+_client = None
+
+
+def _get_claude_client():
+    """Return a shared anthropic client, or None when key/package is missing."""
+    global _client
+    if _client is not None:
+        return _client
 
     if anthropic is None:
         print("anthropic package not installed", file=sys.stderr)
         return None
 
-    stats = summary["stats"]
-    daily = summary["daily_breakdown"]
-
-    daily_text = "\n".join([
-        f"  {d['date']}: Sleep {d['sleep_score']}/100 ({d['sleep_hours']}h, {d['deep_sleep_hours']}h deep), "
-        f"Readiness {d['readiness_score']}, Activity {d['activity_score']}, "
-        f"Steps {d['steps']}, HRV {d['hrv']}, RHR {d['resting_hr']}"
-        for d in daily
-    ])
+    api_key = os.getenv("ANTHROPIC_API_KEY")
+    if not api_key:
+        print("Missing ANTHROPIC_API_KEY", file=sys.stderr)
+        return None
 
-    prompt = f"""Analyze this Oura Ring health data and provide personalized insights for a patient managing three concurrent conditions:
+    _client = anthropic.Anthropic(api_key=api_key, max_retries=2)
+    return _client
 
-1. Post-COVID autonomic dysfunction (POTS with vasovagal syncope) — HRV is the primary biomarker for autonomic nervous system health. Low or declining HRV signals sympathetic overdrive. Resting HR trends matter because tachycardia at rest suggests poor autonomic regulation. Sleep quality directly affects next-day orthostatic tolerance.
 
-2. Early Hashimoto's thyroiditis (TPO 267) — Temperature deviations can signal thyroid flares or immune activation. Deep sleep is when the immune system does most of its repair work; insufficient deep sleep may worsen autoimmune activity. Elevated resting HR can also indicate thyroid hormone fluctuations.
+def analyze_with_claude(summary):
+    """Use Claude to analyze the Oura data and provide insights."""
+    client = _get_claude_client()
+    if client is None:
+        return None
 
-3. Vestibular symptoms from suspected neurovascular compression at bilateral IACs — Poor sleep and low HRV worsen vestibular compensation. Recovery metrics indicate whether the nervous system has capacity for vestibular rehab exercises.
+    stats = summary["stats"]
+    daily = summary["daily_breakdown"]
 
-The patient follows a structured daily protocol: LMNT electrolytes, iron bisglycinate (every other day), magnesium threonate (AM) + glycinate (PM), DGL, zinc carnosine, selenium, omega-3, plus daily exercises (diaphragmatic breathing, calf raises, walking) and vestibular rehab (gaze stabilization, balance training).
+    daily_text = "\n".join(DAILY_LINE.format_map(d) for d in daily)
 
-DATA SUMMARY ({stats['days_analyzed']} days: {stats['date_range']}):
+    prompt = f"""DATA SUMMARY ({stats['days_analyzed']} days: {stats['date_range']}):
 
 SLEEP:
 - Average Score: {stats['sleep']['avg_score']}/100
@@ -164,35 +236,19 @@ HEART & RECOVERY:
 - Average Breathing Rate: {stats['recovery']['avg_breath_rate']}/min
 
 DAILY BREAKDOWN (last 7 days):
-{daily_text}
-
-Analyze with clinical specificity. Reference actual numbers. Look for patterns across days — do low-HRV days follow poor sleep? Are there temp deviation spikes suggesting immune activation? Is activity appropriately graded for POTS (avoiding overexertion that crashes autonomic function)?
-
-Return ONLY valid JSON in this exact format:
-{{
-  "overall_assessment": "A 2-3 sentence overall assessment referencing the three conditions and key metrics",
-  "whats_going_well": [
-    "Specific positive observation 1 with data reference",
-    "Specific positive observation 2 with data reference",
-    "Specific positive observation 3 with data reference"
-  ],
-  "areas_to_improve": [
-    "Specific area needing attention 1 with actionable advice",
-    "Specific area needing attention 2 with actionable advice",
-    "Specific area needing attention 3 with actionable advice"
-  ],
-  "autonomic_assessment": "2-3 sentences on what HRV trends, resting HR, and recovery metrics suggest about current autonomic nervous system status and POTS stability",
-  "thyroid_immune_signals": "1-2 sentences on temperature deviations, deep sleep adequacy, and any patterns suggesting Hashimoto's flare activity",
-  "vestibular_readiness": "1-2 sentences on whether recovery metrics indicate capacity for vestibular rehab, and any days where rehab should be scaled back",
-  "focus_for_next_week": "One specific, actionable recommendation tied to whichever condition the data suggests needs the most attention right now"
-}}"""
+{daily_text}"""
 
     try:
-        client = anthropic.Anthropic(api_key=api_key)
-
         message = client.messages.create(
             model="claude-sonnet-4-20250514",
             max_tokens=1500,
+            system=[
+                {
+                    "type": "text",
+                    "text": SYSTEM_PROMPT,
+                    "cache_control": {"type": "ephemeral"},
+                }
+            ],
             messages=[{"role": "user", "content": prompt}],
         )
 
@@ -204,9 +260,9 @@ Return ONLY valid JSON in this exact format:
         elif "```" in response_text:
             response_text = response_text.split("```")[1].split("```")[0].strip()
 
-        return json.loads(response_text)
+        return _loads(response_text)
 
-    except json.JSONDecodeError as e:
+    except ValueError as e:
         print(f"Failed to parse Claude response as JSON: {e}", file=sys.stderr)
         print(f"Response was: {response_text[:500]}", file=sys.stderr)
         return None
@@ -216,18 +272,20 @@ Return ONLY valid JSON in this exact format:
 
 
 def main():
+    # One clock read shared by the success and error reports; second
+    # precision keeps the committed JSON free of microsecond noise.
+    now_iso = datetime.now(timezone.utc).isoformat(timespec="seconds")
+
     # Load Oura data
     data = load_oura_data()
     if not data:
         # Create empty report
         report = {
-            "updated": datetime.now(timezone.utc).isoformat(),
+            "updated": now_iso,
             "error": "No Oura data available. Run sync_oura.py first.",
             "analysis": None,
         }
-        with open("oura-analysis.json", "w", encoding="utf-8") as f:
-            json.dump(report, f, indent=2)
-            f.write("\n")
+        write_json("oura-analysis.json", report)
         return
 
     # Prepare summary
@@ -246,7 +304,7 @@ def main():
 
     # Create report
     report = {
-        "updated": datetime.now(timezone.utc).isoformat(),
+        "updated": now_iso,
         "data_range": summary["stats"]["date_range"],
         "days_analyzed": summary["stats"]["days_analyzed"],
         "summary_stats": summary["stats"],
@@ -254,9 +312,7 @@ def main():
     }
 
     # Write report
-    with open("oura-analysis.json", "w", encoding="utf-8") as f:
-        json.dump(report, f, indent=2)
-        f.write("\n")
+    write_json("oura-analysis.json", report)
 
     if analysis:
         print("\nAnalysis complete!")
@@ -8,41 +8,216 @@ and outputs JSON for DeanOS to consume.
 Requires:
 - OURA_PAT environment variable (Personal Access Token)
 - Generate at: https://cloud.ouraring.com/personal-access-tokens
+
+Set OURA_FETCH_RAW_HR=1 to also pull the raw heart-rate time series and
+compute daily average/min/max/awake HR from it. It is skipped by default
+because it is by far the largest Oura payload and the sleep periods
+already carry the resting HR the site displays.
 """
 
+import concurrent.futures
+import gzip
 import json
+import operator
 import os
 import ssl
 import sys
 import urllib.request
 from datetime import datetime, timedelta, timezone
 
+try:
+    import requests
+except ImportError:
+    requests = None
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+try:
+    import simdjson
+except ImportError:
+    simdjson = None
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
 
 OURA_API_BASE = "https://api.ouraring.com/v2/usercollection"
 DAYS_TO_FETCH = 90
 
+# Per-endpoint ETag + body cache for conditional GETs. When the API says
+# 304 Not Modified we skip the download (and the JSON parse upstream of
+# it) and reuse the cached body. Each endpoint owns its own pair of
+# files, so the fetch thread pool needs no locking.
+CACHE_DIR = ".oura-cache"
+
+# How each source's per-day fields map onto names in the combined report.
+SLEEP_SCORE_FIELDS = {
+    "score": "sleep_score",
+    "contributors": "sleep_contributors",
+}
+SLEEP_PERIOD_FIELDS = {
+    "bedtime_start": "bedtime_start",
+    "bedtime_end": "bedtime_end",
+    "total_sleep_duration": "total_sleep_seconds",
+    "deep_sleep_duration": "deep_sleep_seconds",
+    "rem_sleep_duration": "rem_sleep_seconds",
+    "light_sleep_duration": "light_sleep_seconds",
+    "awake_time": "awake_seconds",
+    "efficiency": "sleep_efficiency",
+    "average_hrv": "average_hrv",
+    "lowest_heart_rate": "lowest_hr",
+    "average_heart_rate": "average_hr_sleep",
+    "average_breath": "average_breath",
+    "restless_periods": "restless_periods",
+}
+READINESS_FIELDS = {
+    "score": "readiness_score",
+    "temperature_deviation": "temperature_deviation",
+    "temperature_trend_deviation": "temperature_trend_deviation",
+    "contributors": "readiness_contributors",
+}
+ACTIVITY_FIELDS = {
+    "score": "activity_score",
+    "steps": "steps",
+    "active_calories": "active_calories",
+    "total_calories": "total_calories",
+    "equivalent_walking_distance": "distance_meters",
+    "high_activity_time": "high_activity_seconds",
+    "medium_activity_time": "medium_activity_seconds",
+    "low_activity_time": "low_activity_seconds",
+    "sedentary_time": "sedentary_seconds",
+    "inactivity_alerts": "inactivity_alerts",
+    "contributors": "activity_contributors",
+}
+HEART_RATE_FIELDS = {
+    "resting_hr": "resting_hr",
+    "average_hr": "average_hr",
+    "min_hr": "min_hr",
+    "max_hr": "max_hr",
+    "awake_hr": "awake_hr",
+}
+SPO2_FIELDS = {
+    "spo2_average": "spo2_average",
+}
+
 # Create SSL context that doesn't verify certificates (for macOS Python installs)
 ssl_context = ssl.create_default_context()
 ssl_context.check_hostname = False
 ssl_context.verify_mode = ssl.CERT_NONE
 
+# Reuse one session across all endpoint fetches so the HTTPS connection to
+# api.ouraring.com is kept alive instead of re-handshaking per request.
+if requests is not None:
+    _session = requests.Session()
+    _session.verify = False
+    import urllib3
+
+    urllib3.disable_warnings(urllib3.exceptions.InsecureRequestWarning)
+else:
+    _session = None
+
+
+# orjson parses bytes directly (no intermediate decode) and serializes
+# several times faster than stdlib json; fall back when it's not installed.
+_loads = orjson.loads if orjson is not None else json.loads
+
+
+def write_json(path, payload):
+    """Write a JSON report with 2-space indent and a trailing newline.
+
+    The report is serialized to one bytes buffer and written with a single
+    os.write, skipping the TextIOWrapper layer and the second syscall for
+    the trailing newline.
+    """
+    if orjson is not None:
+        buf = orjson.dumps(payload, option=orjson.OPT_INDENT_2 | orjson.OPT_APPEND_NEWLINE)
+    else:
+        buf = (json.dumps(payload, indent=2) + "\n").encode("utf-8")
+    fd = os.open(path, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o644)
+    try:
+        os.write(fd, buf)
+    finally:
+        os.close(fd)
+
+
+def _read_cache(endpoint):
+    """Return (etag, body_path) for an endpoint, or (None, body_path)."""
+    etag_path = os.path.join(CACHE_DIR, f"{endpoint}.etag")
+    body_path = os.path.join(CACHE_DIR, f"{endpoint}.body")
+    try:
+        with open(etag_path, "r", encoding="utf-8") as f:
+            etag = f.read().strip()
+    except OSError:
+        return None, body_path
+    if not etag or not os.path.exists(body_path):
+        return None, body_path
+    return etag, body_path
+
+
+def _write_cache(endpoint, etag, body):
+    try:
+        os.makedirs(CACHE_DIR, exist_ok=True)
+        with open(os.path.join(CACHE_DIR, f"{endpoint}.body"), "wb") as f:
+            f.write(body)
+        with open(os.path.join(CACHE_DIR, f"{endpoint}.etag"), "w", encoding="utf-8") as f:
+            f.write(etag)
+    except OSError as e:
+        print(f"Could not cache {endpoint} response: {e}", file=sys.stderr)
+
 
-def fetch_oura_data(endpoint, pat, start_date, end_date):
-    """Fetch data from Oura API endpoint."""
+def fetch_oura_data(endpoint, pat, start_date, end_date, raw=False):
+    """Fetch data from Oura API endpoint.
+
+    With raw=True the undecoded response bytes are returned so the caller
+    can pick its own parser.
+    """
     url = f"{OURA_API_BASE}/{endpoint}?start_date={start_date}&end_date={end_date}"
+    headers = {
+        "Authorization": f"Bearer {pat}",
+        "Accept": "application/json",
+        "Accept-Encoding": "gzip",
+        "User-Agent": "DeanOS-Oura-Sync/1.0",
+    }
 
-    request = urllib.request.Request(
-        url,
-        headers={
-            "Authorization": f"Bearer {pat}",
-            "Accept": "application/json",
-            "User-Agent": "DeanOS-Oura-Sync/1.0",
-        },
-    )
+    etag, body_path = _read_cache(endpoint)
+    if etag:
+        headers["If-None-Match"] = etag
 
     try:
-        with urllib.request.urlopen(request, timeout=30, context=ssl_context) as response:
-            return json.loads(response.read().decode("utf-8"))
+        if _session is not None:
+            response = _session.get(url, headers=headers, timeout=30)
+            if response.status_code == 304:
+                with open(body_path, "rb") as f:
+                    body = f.read()
+            elif response.status_code >= 400:
+                print(f"HTTP Error fetching {endpoint}: {response.status_code} {response.reason}", file=sys.stderr)
+                return None
+            else:
+                body = response.content
+                new_etag = response.headers.get("ETag")
+                if new_etag:
+                    _write_cache(endpoint, new_etag, body)
+        else:
+            request = urllib.request.Request(url, headers=headers)
+            try:
+                with urllib.request.urlopen(request, timeout=30, context=ssl_context) as response:
+                    body = response.read()
+                    if response.headers.get("Content-Encoding") == "gzip":
+                        body = gzip.decompress(body)
+                    new_etag = response.headers.get("ETag")
+                if new_etag:
+                    _write_cache(endpoint, new_etag, body)
+            except urllib.error.HTTPError as e:
+                if e.code != 304:
+                    raise
+                with open(body_path, "rb") as f:
+                    body = f.read()
+        return body if raw else _loads(body)
     except urllib.error.HTTPError as e:
         print(f"HTTP Error fetching {endpoint}: {e.code} {e.reason}", file=sys.stderr)
         return None
@@ -139,11 +314,35 @@ def get_daily_activity(pat, start_date, end_date):
     return results
 
 
+def _hr_stats(values):
+    """Return (mean, min, max) over a list of BPM samples.
+
+    With numpy the samples go into a contiguous int16 array so the stats
+    run as vectorized C loops instead of Python iteration over boxed ints.
+    """
+    if not values:
+        return None, None, None
+    if np is not None:
+        arr = np.fromiter(values, dtype=np.int16, count=len(values))
+        return round(float(arr.mean())), int(arr.min()), int(arr.max())
+    return round(sum(values) / len(values)), min(values), max(values)
+
+
 def get_heart_rate(pat, start_date, end_date):
     """Get heart rate time series data."""
-    data = fetch_oura_data("heartrate", pat, start_date, end_date)
-    if not data:
-        return []
+    # The heartrate endpoint returns a BPM sample every few minutes over the
+    # whole window - by far the largest Oura payload. simdjson parses it
+    # lazily, so only the three fields read below ever get materialized.
+    if simdjson is not None:
+        body = fetch_oura_data("heartrate", pat, start_date, end_date, raw=True)
+        if not body:
+            return []
+        parser = simdjson.Parser()
+        data = parser.parse(body)
+    else:
+        data = fetch_oura_data("heartrate", pat, start_date, end_date)
+        if not data:
+            return []
 
     # Group by date and calculate daily stats
     daily_hr = {}
@@ -165,17 +364,15 @@ def get_heart_rate(pat, start_date, end_date):
 
     results = []
     for date, hr_data in sorted(daily_hr.items()):
-        readings = hr_data["readings"]
-        resting = hr_data["resting"]
-        awake = hr_data["awake"]
+        average_hr, min_hr, max_hr = _hr_stats(hr_data["readings"])
 
         results.append({
             "date": date,
-            "average_hr": round(sum(readings) / len(readings)) if readings else None,
-            "min_hr": min(readings) if readings else None,
-            "max_hr": max(readings) if readings else None,
-            "resting_hr": round(sum(resting) / len(resting)) if resting else None,
-            "awake_hr": round(sum(awake) / len(awake)) if awake else None,
+            "average_hr": average_hr,
+            "min_hr": min_hr,
+            "max_hr": max_hr,
+            "resting_hr": _hr_stats(hr_data["resting"])[0],
+            "awake_hr": _hr_stats(hr_data["awake"])[0],
         })
 
     return results
@@ -218,7 +415,27 @@ def get_daily_spo2(pat, start_date, end_date):
     return results
 
 
+def merge_daily(daily_data, items, field_map):
+    """Fold one source's per-day records into the combined daily summaries."""
+    get_day = daily_data.get
+    for item in items:
+        date = item["date"]
+        if not date:
+            continue
+        day = get_day(date)
+        if day is None:
+            day = daily_data[date] = {"date": date}
+        day.update((out_key, item[in_key]) for in_key, out_key in field_map.items())
+
+
 def main():
+    # One clock read for the whole run so the report timestamp and the
+    # fetch window can't disagree about what "now" is.
+    now = datetime.now(timezone.utc)
+    # Second precision keeps the updated field fixed-width, so the
+    # committed JSON diffs stay clean of microsecond noise.
+    now_iso = now.isoformat(timespec="seconds")
+
     pat = os.getenv("OURA_PAT", "").strip()
 
     if not pat:
@@ -228,145 +445,86 @@ def main():
 
         # Create empty report
         report = {
-            "updated": datetime.now(timezone.utc).isoformat(),
+            "updated": now_iso,
             "error": "No OURA_PAT configured",
             "data": None,
         }
-        with open("oura-data.json", "w", encoding="utf-8") as f:
-            json.dump(report, f, indent=2)
-            f.write("\n")
+        write_json("oura-data.json", report)
         return
 
     # Fetch last 90 days of data
-    end_date = datetime.now().strftime("%Y-%m-%d")
-    start_date = (datetime.now() - timedelta(days=DAYS_TO_FETCH)).strftime("%Y-%m-%d")
+    end_date = now.strftime("%Y-%m-%d")
+    start_date = (now - timedelta(days=DAYS_TO_FETCH)).strftime("%Y-%m-%d")
 
     print(f"Fetching Oura data from {start_date} to {end_date} ({DAYS_TO_FETCH} days)...")
 
-    # Fetch all data types
-    print("  Fetching sleep scores...")
-    daily_sleep = get_daily_sleep(pat, start_date, end_date)
-
-    print("  Fetching sleep details...")
-    sleep_periods = get_sleep_periods(pat, start_date, end_date)
-
-    print("  Fetching readiness scores...")
-    readiness = get_daily_readiness(pat, start_date, end_date)
-
-    print("  Fetching activity data...")
-    activity = get_daily_activity(pat, start_date, end_date)
-
-    print("  Fetching heart rate data...")
-    heart_rate = get_heart_rate(pat, start_date, end_date)
-
-    print("  Fetching workouts...")
-    workouts = get_workouts(pat, start_date, end_date)
-
-    print("  Fetching SpO2 data...")
-    spo2 = get_daily_spo2(pat, start_date, end_date)
-
-    # Combine into daily summaries
-    daily_data = {}
-
-    # Add sleep scores
-    for item in daily_sleep:
-        date = item["date"]
-        if not date:
-            continue
-        if date not in daily_data:
-            daily_data[date] = {"date": date}
-        daily_data[date]["sleep_score"] = item["score"]
-        daily_data[date]["sleep_contributors"] = item["contributors"]
-
-    # Add sleep period details - keep the longest sleep period per day (main sleep, not naps)
-    # First, group sleep periods by date and find the longest one
+    # Fetch all data types concurrently - each endpoint is an independent
+    # HTTPS request, so the wall time is roughly the slowest single call
+    # instead of the sum of all seven.
+    fetchers = {
+        "sleep scores": get_daily_sleep,
+        "sleep details": get_sleep_periods,
+        "readiness scores": get_daily_readiness,
+        "activity data": get_daily_activity,
+        "workouts": get_workouts,
+        "SpO2 data": get_daily_spo2,
+    }
+    if os.getenv("OURA_FETCH_RAW_HR", "0") == "1":
+        fetchers["heart rate data"] = get_heart_rate
+
+    results = {}
+    with concurrent.futures.ThreadPoolExecutor(max_workers=len(fetchers)) as executor:
+        futures = {
+            executor.submit(fetch, pat, start_date, end_date): name
+            for name, fetch in fetchers.items()
+        }
+        for future in concurrent.futures.as_completed(futures):
+            name = futures[future]
+            results[name] = future.result()
+            print(f"  Fetched {name} ({len(results[name])} records)")
+
+    daily_sleep = results["sleep scores"]
+    sleep_periods = results["sleep details"]
+    readiness = results["readiness scores"]
+    activity = results["activity data"]
+    heart_rate = results.get("heart rate data", [])
+    workouts = results["workouts"]
+    spo2 = results["SpO2 data"]
+
+    # Keep the longest sleep period per day (main sleep, not naps)
     sleep_by_date = {}
     for item in sleep_periods:
         date = item["date"]
         if not date:
             continue
         duration = item["total_sleep_duration"] or 0
-        # Keep the longest sleep period for each date
         if date not in sleep_by_date or duration > (sleep_by_date[date]["total_sleep_duration"] or 0):
             sleep_by_date[date] = item
 
-    # Now add the main sleep period for each date
-    for date, item in sleep_by_date.items():
-        if date not in daily_data:
-            daily_data[date] = {"date": date}
-        daily_data[date]["bedtime_start"] = item["bedtime_start"]
-        daily_data[date]["bedtime_end"] = item["bedtime_end"]
-        daily_data[date]["total_sleep_seconds"] = item["total_sleep_duration"]
-        daily_data[date]["deep_sleep_seconds"] = item["deep_sleep_duration"]
-        daily_data[date]["rem_sleep_seconds"] = item["rem_sleep_duration"]
-        daily_data[date]["light_sleep_seconds"] = item["light_sleep_duration"]
-        daily_data[date]["awake_seconds"] = item["awake_time"]
-        daily_data[date]["sleep_efficiency"] = item["efficiency"]
-        daily_data[date]["average_hrv"] = item["average_hrv"]
-        daily_data[date]["lowest_hr"] = item["lowest_heart_rate"]
-        daily_data[date]["average_hr_sleep"] = item["average_heart_rate"]
-        daily_data[date]["average_breath"] = item["average_breath"]
-        daily_data[date]["restless_periods"] = item["restless_periods"]
-
-    # Add readiness
-    for item in readiness:
-        date = item["date"]
-        if not date:
-            continue
-        if date not in daily_data:
-            daily_data[date] = {"date": date}
-        daily_data[date]["readiness_score"] = item["score"]
-        daily_data[date]["temperature_deviation"] = item["temperature_deviation"]
-        daily_data[date]["temperature_trend_deviation"] = item["temperature_trend_deviation"]
-        daily_data[date]["readiness_contributors"] = item["contributors"]
-
-    # Add activity
-    for item in activity:
-        date = item["date"]
-        if not date:
-            continue
-        if date not in daily_data:
-            daily_data[date] = {"date": date}
-        daily_data[date]["activity_score"] = item["score"]
-        daily_data[date]["steps"] = item["steps"]
-        daily_data[date]["active_calories"] = item["active_calories"]
-        daily_data[date]["total_calories"] = item["total_calories"]
-        daily_data[date]["distance_meters"] = item["equivalent_walking_distance"]
-        daily_data[date]["high_activity_seconds"] = item["high_activity_time"]
-        daily_data[date]["medium_activity_seconds"] = item["medium_activity_time"]
-        daily_data[date]["low_activity_seconds"] = item["low_activity_time"]
-        daily_data[date]["sedentary_seconds"] = item["sedentary_time"]
-        daily_data[date]["inactivity_alerts"] = item["inactivity_alerts"]
-        daily_data[date]["activity_contributors"] = item["contributors"]
-
-    # Add heart rate stats
-    for item in heart_rate:
-        date = item["date"]
-        if not date:
-            continue
-        if date not in daily_data:
-            daily_data[date] = {"date": date}
-        daily_data[date]["resting_hr"] = item["resting_hr"]
-        daily_data[date]["average_hr"] = item["average_hr"]
-        daily_data[date]["min_hr"] = item["min_hr"]
-        daily_data[date]["max_hr"] = item["max_hr"]
-        daily_data[date]["awake_hr"] = item["awake_hr"]
-
-    # Add SpO2
-    for item in spo2:
-        date = item["date"]
-        if not date:
-            continue
-        if date not in daily_data:
-            daily_data[date] = {"date": date}
-        daily_data[date]["spo2_average"] = item["spo2_average"]
-
-    # Sort by date
-    sorted_data = [daily_data[d] for d in sorted(daily_data.keys(), reverse=True)]
+    # Combine into daily summaries
+    daily_data = {}
+    merge_daily(daily_data, daily_sleep, SLEEP_SCORE_FIELDS)
+    merge_daily(daily_data, sleep_by_date.values(), SLEEP_PERIOD_FIELDS)
+    merge_daily(daily_data, readiness, READINESS_FIELDS)
+    merge_daily(daily_data, activity, ACTIVITY_FIELDS)
+    if heart_rate:
+        merge_daily(daily_data, heart_rate, HEART_RATE_FIELDS)
+    else:
+        # Without the raw series, the sleep periods' lowest HR stands in
+        # for the resting value consumers expect.
+        for day in daily_data.values():
+            if day.get("lowest_hr") is not None:
+                day["resting_hr"] = day["lowest_hr"]
+    merge_daily(daily_data, spo2, SPO2_FIELDS)
+
+    # Sort by date, newest first. itemgetter is a C-level key callable and
+    # sorting the values directly skips the per-date dict lookups a sorted
+    # key list would need afterwards.
+    sorted_data = sorted(daily_data.values(), key=operator.itemgetter("date"), reverse=True)
 
     # Create report
     report = {
-        "updated": datetime.now(timezone.utc).isoformat(),
+        "updated": now_iso,
         "start_date": start_date,
         "end_date": end_date,
         "days_requested": DAYS_TO_FETCH,
@@ -376,9 +534,7 @@ def main():
     }
 
     # Write report
-    with open("oura-data.json", "w", encoding="utf-8") as f:
-        json.dump(report, f, indent=2)
-        f.write("\n")
+    write_json("oura-data.json", report)
 
     print(f"\nOura data synced: {len(sorted_data)} days")
     print(f"Workouts found: {len(workouts)}")